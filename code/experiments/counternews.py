@@ -16,27 +16,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from model.agent import Agent
 from model.world import World
-from model.color_maps import ColorMaps
+from model.color_maps import ColorMaps, state_colors
+from model.arrays import agent_index, state_array
 from model.utils import *
 from model.news import News
 from model.agent import AgentState
+from model.seeds import top_k
 
 def find_degreecentral_nodes(world, k, blacklist, news):
-    degree_centrality = []
-    for _ in range(k):
-        best = None
-        bdeg = -1
-        for a in world.graph.nodes():
-            if world.agents[a] in degree_centrality or world.agents[a] in blacklist:
-                continue
-            d = world.graph.out_degree(a)
-            if d > bdeg:
-                bdeg = d
-                best = world.agents[a]
-        degree_centrality.append(best)
+    names = top_k(world, k, 'out_degree', blacklist=[a.name for a in blacklist])
     s2 = {}
-    for agent in degree_centrality:
-        s2[agent] = news.name
+    for name in names:
+        s2[world.agents[name]] = news.name
     return s2
 
 def activate_agents(agents):
@@ -64,6 +55,9 @@ g_ax = fig.add_subplot(spec[:,:-1])
 s_ax = fig.add_subplot(spec[:,-1])
 starting_points = {0: fakenews_spreader, delay: counternews_spreader}
 layout = nx.spring_layout(w.graph)
+_, position = agent_index(w)
+fakenews_positions = [position[a.name] for a in fakenews_spreader.keys()]
+counternews_positions = [position[a.name] for a in counternews_spreader.keys()]
 for d in starting_points.values():
     for agent in d.keys():
         agent.independence = 1.0 
@@ -88,11 +82,9 @@ for step in range(steps):
     s_ax.legend()
     
     g_ax.clear()
-    clrs = [ColorMaps.coolwarm(1.0) if a in fakenews_spreader.keys() else
-            ColorMaps.coolwarm(0.0) if a in counternews_spreader.keys() else
-            ColorMaps.coolwarm(0.97) if a.states[0] == AgentState.ACTIVE else 
-            ColorMaps.coolwarm(0.02) if a.states[1] == AgentState.ACTIVE else (0.0,0.0,0.0)
-            for a in w.agents.values()]
+    clrs = state_colors(state_array(w), (0.0,0.0,0.0), (0.0,0.0,0.0), ColorMaps.lookup('coolwarm', [0.97, 0.02]))
+    clrs[fakenews_positions, :3] = ColorMaps.coolwarm(1.0)
+    clrs[counternews_positions, :3] = ColorMaps.coolwarm(0.0)
 
     nx.draw_networkx(w.graph,
                      pos=layout,
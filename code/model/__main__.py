@@ -0,0 +1,141 @@
+"""
+Headless batch command line interface.
+
+Usage (from the code folder):
+    python -m model run config.json
+    python -m model sweep config.json --processes 8 --output results.csv
+    python -m model sweep config.json --queue /shared/queue.db
+    python -m model seeds config.json
+    python -m model worker /shared/queue.db
+
+The config is a json file with the keys
+    base: the world spec of the tasks (see task_queue.build_world)
+    grid: dictionary, key = dotted path of a spec entry (e.g. 'news.0.sensation'), value = list of values (sweep)
+    num_samples: the number of samples per grid cell (sweep)
+    seed: the seed of the world (run, seeds) or of the first task (sweep), else the seed of base, else 0
+    seeds: dictionary with centralities (list, see seeds.CENTRALITIES) and k (list of integers) (seeds)
+
+The simulation core is imported without plotting libraries and networkx is imported only when a graph is created,
+so that starting a worker is cheap. Use --startup to print the start-up time.
+"""
+import time
+
+_start = time.perf_counter()
+
+import argparse
+import json
+import multiprocessing
+import sys
+
+from .task_queue import (DEFAULT_SPEC, TaskQueue, add_worker_arguments, build_world, run_task, sweep_specs,
+                         worker_command, write_results)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog='python -m model', description='Batch simulations of the news spreading '
+                                                                         'model')
+    parser.add_argument('--startup', action='store_true', help='print the start-up time to stderr')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run = commands.add_parser('run', help='run the simulation of the base spec')
+    run.add_argument('config')
+
+    sweep = commands.add_parser('sweep', help='run the simulations of the grid')
+    sweep.add_argument('config')
+    sweep.add_argument('--processes', type=int, default=1, help='number of local processes')
+    sweep.add_argument('--output', default=None, help='csv file for the results (default: json to stdout)')
+    sweep.add_argument('--queue', default=None, help='submit the tasks to this SQLite queue instead of running them')
+
+    seeds = commands.add_parser('seeds', help='select the initial agents of the base world by centrality')
+    seeds.add_argument('config')
+
+    add_worker_arguments(commands.add_parser('worker', help='run tasks of a SQLite queue until it is empty'))
+
+    arguments = parser.parse_args(arguments)
+    if arguments.startup:
+        report_startup()
+
+    if arguments.command == 'worker':
+        worker_command(arguments)
+        return
+
+    config = load_config(arguments.config)
+    if arguments.command == 'run':
+        spec = dict(list(config['base'].items()) + [('seed', config_seed(config))])
+        print(json.dumps(run_task(spec)))
+    elif arguments.command == 'sweep':
+        specs = sweep_specs(config['base'], config.get('grid', {}), config.get('num_samples', 1),
+                            config_seed(config))
+        if arguments.queue is not None:
+            TaskQueue(arguments.queue).submit(specs)
+            print('Submitted', len(specs), 'tasks to', arguments.queue)
+            return
+
+        if arguments.processes > 1:
+            with multiprocessing.Pool(arguments.processes) as pool:
+                results = pool.map(run_task, specs)
+        else:
+            results = [run_task(spec) for spec in specs]
+
+        if arguments.output is None:
+            print(json.dumps([{'spec': spec, 'result': result} for spec, result in zip(specs, results)]))
+        else:
+            write_results(list(zip(specs, results)), arguments.output)
+    elif arguments.command == 'seeds':
+        print(json.dumps(select_seeds(config)))
+
+
+def load_config(path):
+    """
+    :param path: string, path of the json config
+    :return: dictionary, the config (the base spec is completed with DEFAULT_SPEC)
+    """
+    with open(path) as file:
+        config = json.load(file)
+    config['base'] = dict(list(DEFAULT_SPEC.items()) + list(config.get('base', {}).items()))
+    return config
+
+
+def config_seed(config):
+    """
+    :param config: dictionary, the config (see load_config)
+    :return: integer, the seed of the config: the top-level seed, else the seed of the base spec, else 0
+    """
+    if config.get('seed') is not None:
+        return config['seed']
+    if config['base'].get('seed') is not None:
+        return config['base']['seed']
+    return 0
+
+
+def select_seeds(config):
+    """
+    :param config: dictionary, the config with the base spec and the seeds entry
+    :return: dictionary, key = centrality, value = dictionary, key = k, value = names of the k most central agents
+    """
+    from .seeds import top_k
+
+    world, _ = build_world(dict(list(config['base'].items()) + [('seed', config_seed(config))]))
+    seeds_config = config.get('seeds', {})
+    ks = seeds_config.get('k', [1])
+
+    selection = {}
+    for centrality in seeds_config.get('centralities', ['out_degree']):
+        # The scores are computed once per world, the top k agents of the largest k contain those of the smaller k
+        ranking = top_k(world, max(ks), centrality)
+        selection[centrality] = dict([(str(k), [int(name) for name in ranking[:k]]) for k in ks])
+    return selection
+
+
+def report_startup():
+    """
+    Prints the time spent importing the command line interface and the heavy modules which were loaded
+    """
+    heavy = [module for module in ('networkx', 'matplotlib', 'seaborn', 'pandas') if module in sys.modules]
+    print('Start-up: {:.1f} ms to import the command line interface, heavy modules loaded: {}'.format(
+        1000 * (time.perf_counter() - _start), ', '.join(heavy) if heavy else 'none'), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
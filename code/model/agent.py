@@ -43,8 +43,8 @@ class Agent:
         """
 
         # Initialise variables
-        updated_states = copy.deepcopy(self.states)
         excitement_scores = dict([(n.name, 0) for n in news.values()])
+        news_active_providers = set()
 
         # Compute the excitement score
         for provider in self.providers:
@@ -55,10 +55,26 @@ class Agent:
                 # add the weight of the provider to the excitement score of the news wrt which the provider is active
                 excitement_scores[name_news_active] = excitement_scores[name_news_active] + (1 - self.independence) * \
                                                       self.weights_providers[provider]
+                news_active_providers.add(name_news_active)
+
+        return self.states_given_excitement(news, excitement_scores, news_active_providers)
+
+    def states_given_excitement(self, news, excitement_scores, news_active_providers):
+        """
+        Checks if and how the state of the agent should be updated given its excitement scores
+
+        :param news: dictionary, key = name of news, value = news object
+        :param excitement_scores: dictionary, key = name of news, value = sum of the weights of the providers active wrt
+                                  that news times (1 - independence)
+        :param news_active_providers: set of integers, names of the news wrt which at least one provider is active
+        :return: updated_states, dictionary, key = name of the news, value = state in which the agent is wrt that news.
+        """
+        updated_states = copy.deepcopy(self.states)
 
-                # Updates the state to INACTIVE if the state was IGNORANT before
-                if updated_states[name_news_active] == AgentState.IGNORANT:
-                    updated_states[name_news_active] = AgentState.INACTIVE
+        # Updates the state to INACTIVE if the state was IGNORANT before
+        for name_news_active in news_active_providers:
+            if updated_states[name_news_active] == AgentState.IGNORANT:
+                updated_states[name_news_active] = AgentState.INACTIVE
 
         # Compute if excitement score is above threshold and adjust the state accordingly
         for n in news.values():
@@ -0,0 +1,108 @@
+import itertools
+import operator
+
+import numpy as np
+
+from .agent import AgentState
+
+
+def agent_index(world):
+    """
+    Positions of the agents in the array representations of the world (the order of world.agents)
+
+    :param world: an instance of the World class
+    :return: names, index: list with the names of the agents (position -> name) and dictionary, key = name of the
+             agent, value = position of the agent
+    """
+    names = list(world.agents.keys())
+    index = dict([(name, position) for position, name in enumerate(names)])
+    return names, index
+
+
+def provider_arrays(world):
+    """
+    Compressed sparse row representation of the in-edges (providers) of the agents.
+
+    The providers of the agent at position i are indices[indptr[i]:indptr[i+1]] and the corresponding weights are
+    weights[indptr[i]:indptr[i+1]].
+
+    :param world: an instance of the World class
+    :return: indptr, indices, weights: numpy arrays
+    """
+    return _edge_arrays(world, 'providers', 'weights_providers')
+
+
+def receiver_arrays(world):
+    """
+    Compressed sparse row representation of the out-edges (receivers) of the agents, see provider_arrays
+
+    :param world: an instance of the World class
+    :return: indptr, indices, weights: numpy arrays
+    """
+    return _edge_arrays(world, 'receivers', 'weights_receivers')
+
+
+def parameter_arrays(world):
+    """
+    :param world: an instance of the World class
+    :return: thresholds, independence: numpy arrays with the parameters of the agents
+    """
+    thresholds = np.array([agent.threshold for agent in world.agents.values()], dtype=float)
+    independence = np.array([agent.independence for agent in world.agents.values()], dtype=float)
+    return thresholds, independence
+
+
+def state_array(world):
+    """
+    Compact representation of the states of the agents
+
+    :param world: an instance of the World class
+    :return: numpy array of shape (number of agents, number of news), entry [i, j] = value of the AgentState of the
+             agent at position i wrt the j-th news of world.news
+    """
+    news_names = list(world.news.keys())
+    if len(news_names) == 0:
+        return np.empty((len(world.agents), 0), dtype=np.int8)
+
+    # One pass over the states of all agents in C (itemgetter returns the states in the order of world.news)
+    getter = operator.itemgetter(*news_names)
+    if len(news_names) == 1:
+        getter = lambda agent_states: (agent_states[news_names[0]],)
+    values = dict([(state, state.value) for state in AgentState])
+    states = map(values.__getitem__, itertools.chain.from_iterable(
+        getter(agent.states) for agent in world.agents.values()))
+    return np.fromiter(states, dtype=np.int8, count=len(world.agents) * len(news_names)).reshape(
+        len(world.agents), len(news_names))
+
+
+def set_state_array(world, states):
+    """
+    Sets the states of the agents from their compact representation (see state_array)
+
+    :param world: an instance of the World class
+    :param states: numpy array of shape (number of agents, number of news)
+    """
+    agent_states = [AgentState(value) for value in range(len(AgentState))]
+    news_names = list(world.news.keys())
+    for agent, row in zip(world.agents.values(), states.tolist()):
+        agent.states = dict([(news_name, agent_states[value]) for news_name, value in zip(news_names, row)])
+
+
+def _edge_arrays(world, neighbours_attribute, weights_attribute):
+    _, index = agent_index(world)
+
+    degrees = [len(getattr(agent, neighbours_attribute)) for agent in world.agents.values()]
+    indptr = np.zeros(len(degrees) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(degrees)
+
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    weights = np.empty(indptr[-1], dtype=float)
+    position = 0
+    for agent in world.agents.values():
+        agent_weights = getattr(agent, weights_attribute)
+        for neighbour in getattr(agent, neighbours_attribute):
+            indices[position] = index[neighbour]
+            weights[position] = agent_weights[neighbour]
+            position += 1
+
+    return indptr, indices, weights
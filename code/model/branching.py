@@ -0,0 +1,137 @@
+"""
+Delay sweeps for two competing news (see multiple_news_delay.ipynb and experiments/counternews.py).
+
+For every delay d the first d steps only contain the first news, hence they are the same for all delays. The prefix
+is simulated once and the world is checkpointed at each delay. The second news is then injected in a branch started
+from the checkpoint, so that a sweep over D delays costs one prefix and D suffixes instead of D full runs.
+"""
+import multiprocessing
+
+from .agent import AgentState
+from .arrays import set_state_array, state_array
+
+
+def checkpoint(world):
+    """
+    Compact copy of the dynamic state of the world (states of the agents, news and time)
+
+    :param world: an instance of the World class
+    :return: dictionary with the checkpoint, see restore
+    """
+    return {
+        'states': state_array(world),
+        'news': dict([(nw.name, (nw.sensation, nw.time_out)) for nw in world.news.values()]),
+        'time': world.time
+    }
+
+
+def restore(world, world_checkpoint):
+    """
+    Restores the dynamic state of the world from a checkpoint (the world must be the one the checkpoint was taken
+    from or a copy of it)
+
+    :param world: an instance of the World class
+    :param world_checkpoint: dictionary, a checkpoint returned by checkpoint
+    """
+    set_state_array(world, world_checkpoint['states'])
+    for news_name, (sensation, time_out) in world_checkpoint['news'].items():
+        world.news[news_name].sensation = sensation
+        world.news[news_name].time_out = time_out
+    world.time = world_checkpoint['time']
+    world.refresh_accumulators()
+
+
+def delay_sweep(world, first_news, first_agents, second_news, second_agents, delays, n_iter=20,
+                fix_initial_agents=True, processes=1):
+    """
+    Runs the dynamics of two competing news for several delays between the launches of the news.
+
+    The first news is launched at time 0 by first_agents, the second news is launched at time delay by second_agents
+    and the world is updated n_iter times in total (as full_dynamics in multiple_news_delay.ipynb).
+
+    :param world: an instance of the World class containing the two news, all agents are reset to ignorant
+    :param first_news: integer, name of the news launched at time 0
+    :param first_agents: list of integers, names of the agents launching the first news
+    :param second_news: integer, name of the news launched after the delay
+    :param second_agents: list of integers, names of the agents launching the second news
+    :param delays: list of integers in [0, n_iter], the delays between the two news
+    :param n_iter: integer, the number of updates of the world
+    :param fix_initial_agents: bool, if True the independence of the agents launching the news is set to 1.0
+    :param processes: integer, the number of processes used to run the branches
+    :return: dictionary, key = delay, value = (number of agents active wrt the first news, number of agents active wrt
+             the second news) at the end of the dynamics
+    """
+    world.reset()
+    if fix_initial_agents:
+        for agent_name in list(first_agents) + list(second_agents):
+            world.agents[agent_name].independence = 1.0
+
+    # Simulate the prefix with the first news only and take a checkpoint at each delay
+    checkpoints = {}
+    world.news[first_news].reset()
+    activate_agents(world, first_agents, first_news)
+    for t in range(max(delays) + 1):
+        if t in delays:
+            checkpoints[t] = checkpoint(world)
+        if t < max(delays):
+            world.update()
+
+    branches = [(delay, checkpoints[delay]) for delay in sorted(set(delays))]
+    branch_arguments = (second_news, second_agents, n_iter)
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_branch_worker, initargs=(world,)) as pool:
+            results = pool.starmap(_run_branch_worker, [branch + branch_arguments for branch in branches])
+    else:
+        results = [run_branch(world, *(branch + branch_arguments)) for branch in branches]
+
+    return dict([(delay, (number_active[first_news], number_active[second_news]))
+                 for (delay, _), number_active in zip(branches, results)])
+
+
+def run_branch(world, delay, world_checkpoint, news_name, agents, n_iter):
+    """
+    Restores a checkpoint, launches a news and updates the world until time n_iter
+
+    :param world: an instance of the World class
+    :param delay: integer, the time of the checkpoint
+    :param world_checkpoint: dictionary, a checkpoint returned by checkpoint
+    :param news_name: integer, the name of the news to launch
+    :param agents: list of integers, names of the agents launching the news
+    :param n_iter: integer, the time at which the dynamics stops
+    :return: dictionary, key = name of news, value = number of agents active wrt the news at time n_iter
+    """
+    restore(world, world_checkpoint)
+    world.news[news_name].reset()
+    activate_agents(world, agents, news_name)
+    for _ in range(delay, n_iter):
+        world.update()
+
+    number_active = {}
+    for name in world.news:
+        number_active[name] = len([agent for agent in world.agents.values() if agent.states[name] == AgentState.ACTIVE])
+    return number_active
+
+
+def activate_agents(world, agents, news_name):
+    """
+    Activates the agents wrt to a news
+
+    :param world: an instance of the World class
+    :param agents: list of integers, names of the agents to activate
+    :param news_name: integer, the name of the news
+    """
+    for agent_name in agents:
+        world.set_agent_state(agent_name, news_name, AgentState.ACTIVE)
+
+
+# Copy of the world in each worker process, it is sent only once per process
+_branch_world = None
+
+
+def _init_branch_worker(world):
+    global _branch_world
+    _branch_world = world
+
+
+def _run_branch_worker(delay, world_checkpoint, news_name, agents, n_iter):
+    return run_branch(_branch_world, delay, world_checkpoint, news_name, agents, n_iter)
@@ -1,43 +1,88 @@
 import csv
 import os
 
+import numpy as np
+
+from .agent import AgentState
+
 
 class ColorMaps:
     """
     class that has some static methods to compute the rgb value for a value x in [0.0,1.0)
     for different color maps
     use ColorMaps.<map-function>(x), where <map-function> is one of the implemented functions in the class:
-    plasma, blackbody
+    plasma, blackbody, coolwarm
+    use ColorMaps.lookup(<map-name>, values) to compute the rgb values of a whole array of values at once
     """
     plasma_map = None  # static
     blackbody_map = None  # static
     coolwarm_map = None
-    clamp = lambda x: 0.0 if x < 0.0 else (1.0 if x > 1.0 else x)
     cmap_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cmaps')
 
     @staticmethod
     def plasma(x):
-        x = ColorMaps.clamp(x)
-        if ColorMaps.plasma_map is None:
-            ColorMaps.plasma_map = read_cmap(os.path.join(ColorMaps.cmap_path, "plasma_float_0256"))
-        i = int((len(ColorMaps.plasma_map) - 1) * x)  # TODO interpolate
-        return ColorMaps.plasma_map[i]
+        return tuple(ColorMaps.lookup('plasma', x).tolist())
 
     @staticmethod
     def blackbody(x):
-        x = ColorMaps.clamp(x)
-        if ColorMaps.blackbody_map is None:
-            ColorMaps.blackbody_map = read_cmap(os.path.join(ColorMaps.cmap_path, "blackbody_float_0256"))
-        i = int((len(ColorMaps.blackbody_map) - 1) * x)  # TODO interpolate
-        return ColorMaps.blackbody_map[i]
+        return tuple(ColorMaps.lookup('blackbody', x).tolist())
 
     @staticmethod
     def coolwarm(x):
-        x = ColorMaps.clamp(x)
-        if ColorMaps.coolwarm_map is None:
-            ColorMaps.coolwarm_map = read_cmap(os.path.join(ColorMaps.cmap_path, "coolwarm_float_0256"))
-        i = int((len(ColorMaps.coolwarm_map) - 1) * x)  # TODO interpolate
-        return ColorMaps.coolwarm_map[i]
+        return tuple(ColorMaps.lookup('coolwarm', x).tolist())
+
+    @staticmethod
+    def table(name):
+        """
+        :param name: string, name of the color map (plasma, blackbody or coolwarm)
+        :return: numpy array of shape (number of entries, 3), the rgb values of the color map (read once)
+        """
+        attribute = name + '_map'
+        if getattr(ColorMaps, attribute, None) is None:
+            if not hasattr(ColorMaps, attribute):
+                raise ValueError('Unknown color map ' + str(name))
+            setattr(ColorMaps, attribute, np.array(read_cmap(os.path.join(ColorMaps.cmap_path, name + "_float_0256"))))
+        return getattr(ColorMaps, attribute)
+
+    @staticmethod
+    def lookup(name, values):
+        """
+        Computes the rgb values of an array of values, linearly interpolated between the entries of the color map
+
+        :param name: string, name of the color map (plasma, blackbody or coolwarm)
+        :param values: float or array of floats, the values are clamped to [0,1]
+        :return: numpy array of shape values.shape + (3,)
+        """
+        table = ColorMaps.table(name)
+        positions = np.clip(np.asarray(values, dtype=float), 0.0, 1.0) * (len(table) - 1)
+        lower = np.minimum(positions.astype(np.int64), len(table) - 2)
+        fraction = (positions - lower)[..., np.newaxis]
+        return (1 - fraction) * table[lower] + fraction * table[lower + 1]
+
+
+def state_colors(states, ignorant_color, inactive_color, news_colors, alpha=1.0):
+    """
+    Computes the colors of all the agents from their states at once. An agent has the color of the (first) news wrt
+    which it is active, else the inactive color if it is inactive wrt at least one news, else the ignorant color (as
+    Visualization.determine_color_node).
+
+    :param states: numpy array of shape (number of agents, number of news), see arrays.state_array
+    :param ignorant_color: rgb triple, the color of the ignorant agents
+    :param inactive_color: rgb triple, the color of the inactive agents
+    :param news_colors: list of rgb triples, the colors of the agents active wrt each news (in the order of the columns
+                        of states)
+    :param alpha: float in [0,1], the alpha value of the colors
+    :return: numpy array of shape (number of agents, 4), the rgba values of the agents
+    """
+    palette = np.empty((len(news_colors) + 2, 4))
+    palette[:, :3] = np.vstack([ignorant_color, inactive_color] + list(news_colors))
+    palette[:, 3] = alpha
+
+    active = states == AgentState.ACTIVE.value
+    choice = (states == AgentState.INACTIVE.value).any(axis=1).astype(np.int64)
+    has_active = active.any(axis=1)
+    choice[has_active] = 2 + np.argmax(active[has_active], axis=1)
+    return palette[choice]
 
 
 def read_cmap(name):
@@ -0,0 +1,157 @@
+import numpy as np
+
+from .agent import AgentState
+from .news import News
+from .utils import construct_world
+
+
+# Parameters for which the critical value can be searched. The final cascade size is increasing in the sensation and
+# decreasing in the threshold and in the independence.
+PARAMETERS = ('sensation', 'threshold', 'independence')
+
+
+def sample_world(num_agents, initial_agents, name_news=1):
+    """
+    Samples a world with a single news as in agent_phase_diagram.ipynb (random thresholds and independence, news
+    without decay) together with a random set of initial active agents.
+
+    :param num_agents: integer, the number of agents
+    :param initial_agents: integer, the number of initial active agents
+    :param name_news: integer, the name of the news
+    :return: world, initial_agent_names: an instance of the World class and a list with the names of the initial
+             active agents
+    """
+    news = {name_news: News(name_news, 0.0, decay_parameter=0.0)}
+
+    agent_names = list(range(num_agents))
+    agent_threshold = np.random.random(num_agents)
+    agent_independence = np.random.random(num_agents)
+
+    world = construct_world(agent_names, agent_threshold, agent_independence, news)
+    initial_agent_names = list(np.random.choice(agent_names, initial_agents, replace=False))
+
+    return world, initial_agent_names
+
+
+def set_parameter(world, parameter, value):
+    """
+    Sets a parameter to the same value for all the agents (threshold, independence) or all the news (sensation)
+
+    :param world: an instance of the World class
+    :param parameter: string, one of PARAMETERS
+    :param value: float in [0,1], the new value of the parameter
+    """
+    if parameter == 'sensation':
+        for nw in world.news.values():
+            nw.init_sensation = value
+            nw.sensation = value
+    elif parameter == 'threshold':
+        for agent in world.agents.values():
+            agent.threshold = value
+    elif parameter == 'independence':
+        for agent in world.agents.values():
+            agent.independence = value
+    else:
+        raise ValueError('Unknown parameter ' + str(parameter) + ', expected one of ' + str(PARAMETERS))
+
+
+def cascade_fraction(world, initial_active_agents, max_iter=100):
+    """
+    Resets the world, activates the initial agents and runs the dynamics until convergence.
+
+    :param world: an instance of the World class with a single news
+    :param initial_active_agents: list of integers, names of the agents which are active at the start
+    :param max_iter: int, maximal number of iterations
+    :return: float in [0,1], the fraction of active agents at the end of the dynamics
+    """
+    world.reset()
+
+    name_news = list(world.news.keys())[0]
+    for agent_name in initial_active_agents:
+        world.agents[agent_name].states[name_news] = AgentState.ACTIVE
+
+    number_active, _, _ = world.full_dynamics(max_iter=max_iter)
+
+    return number_active / len(world.agents)
+
+
+def find_critical_value(world, initial_active_agents, parameter, target_fraction=0.5, low=0.0, high=1.0,
+                        tolerance=1e-3, max_iter=100):
+    """
+    Finds by bisection the value of a parameter at which the final cascade size crosses target_fraction.
+
+    With a single news and no decay the final cascade size is monotone in the sensation, the threshold and the
+    independence (for a fixed graph, parameters of the other agents and initial active agents). Hence the critical
+    value can be found with 2 + log2((high - low) / tolerance) simulations instead of a full grid. The world is reset
+    between the simulations, so it is prepared only once.
+
+    Note that the parameter is set to the same value for all agents, the world keeps the last probed value.
+
+    :param world: an instance of the World class with a single news without decay
+    :param initial_active_agents: list of integers, names of the agents which are active at the start
+    :param parameter: string, one of PARAMETERS
+    :param target_fraction: float in [0,1], the fraction of active agents which defines the critical value
+    :param low: float, lower end of the search interval
+    :param high: float, upper end of the search interval
+    :param tolerance: float, the length of the final search interval
+    :param max_iter: int, maximal number of iterations for a single simulation
+    :return: float, the critical value (np.nan if the cascade does not cross target_fraction in [low, high])
+    """
+    if len(world.news) != 1 or any(nw.decay_parameter != 0 for nw in world.news.values()):
+        raise ValueError('The cascade size is monotone only for a single news without decay')
+
+    # above(value) is False below the critical value and True above it
+    increasing = parameter == 'sensation'
+
+    def above(value):
+        set_parameter(world, parameter, value)
+        reached = cascade_fraction(world, initial_active_agents, max_iter) >= target_fraction
+        return reached == increasing
+
+    if above(low) == above(high):
+        return np.nan
+
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if above(middle):
+            high = middle
+        else:
+            low = middle
+
+    return (low + high) / 2
+
+
+def critical_curve(worlds, initial_active_agents, parameter, curve_parameter, curve_values, target_fraction=0.5,
+                   low=0.0, high=1.0, tolerance=1e-3, max_iter=100):
+    """
+    Computes the critical curve of a phase diagram (e.g. the critical sensation as a function of the threshold).
+    For each value of curve_parameter the critical value of parameter is searched in each of the sampled worlds.
+
+    :param worlds: list of instances of the World class (one per sample), see sample_world
+    :param initial_active_agents: list of lists of integers, the initial active agents for each world
+    :param parameter: string, one of PARAMETERS, the parameter whose critical value is searched
+    :param curve_parameter: string, one of PARAMETERS, the parameter along the curve
+    :param curve_values: list of floats, the values of curve_parameter
+    :param target_fraction: float in [0,1], the fraction of active agents which defines the critical value
+    :param low: float, lower end of the search interval
+    :param high: float, upper end of the search interval
+    :param tolerance: float, precision of the critical values
+    :param max_iter: int, maximal number of iterations for a single simulation
+    :return: mean, std, critical_values: arrays with the mean and standard deviation over the samples for each value of
+             curve_parameter and the array of shape (len(curve_values), len(worlds)) with all the critical values
+    """
+    if parameter == curve_parameter:
+        raise ValueError('parameter and curve_parameter must be different')
+
+    critical_values = np.full((len(curve_values), len(worlds)), np.nan)
+    for i, value in enumerate(curve_values):
+        for j, (world, initial_agents) in enumerate(zip(worlds, initial_active_agents)):
+            set_parameter(world, curve_parameter, value)
+            critical_values[i, j] = find_critical_value(world, initial_agents, parameter, target_fraction, low, high,
+                                                        tolerance, max_iter)
+
+    # Samples where the target is not crossed are ignored (rows without any crossing give nan)
+    mean = np.array([np.mean(row[~np.isnan(row)]) if np.any(~np.isnan(row)) else np.nan for row in critical_values])
+    std = np.array([np.std(row[~np.isnan(row)]) if np.any(~np.isnan(row)) else np.nan for row in critical_values])
+
+    return mean, std, critical_values
@@ -0,0 +1,287 @@
+"""
+Fast estimates of the final cascade size of a single news without decay.
+
+An agent becomes active once (1 - independence) * (sum of the weights of its active providers) >= threshold *
+(1 - sensation), see Agent.updated_states. This is a Watts threshold model, hence the final cascade size can be
+estimated without simulating the agents:
+* mean_field_cascade uses only the degree distribution (generating functions, locally tree-like graph and uniform
+  weights 1 / degree)
+* message_passing_cascade uses the actual graph and weights and assumes that the providers of an agent are
+  independent (tree approximation)
+Close to the transition the estimates give the size of the global cascade, while in the simulations a small set of
+initial active agents triggers it only in some of the samples. Use deviation_from_simulation to check the estimates
+before using them to screen parameter regions.
+"""
+import numpy as np
+
+from .arrays import agent_index, parameter_arrays, provider_arrays
+
+
+# Agents with an in-degree up to EXACT_DEGREE are evaluated exactly, for larger in-degrees the weighted sum of the
+# active providers is approximated by a normal distribution
+EXACT_DEGREE = 6
+
+# Tolerance of the threshold comparisons (the sums of the weights are not exact)
+EPSILON = 1e-12
+
+
+def mean_field_cascade(degrees, thresholds, independence, sensation, initial_fraction, tolerance=1e-9, max_iter=1000):
+    """
+    Generating-function estimate of the final cascade size from the degree distribution.
+
+    The thresholds and independence of the agents are assumed to be independent of the degree, hence the response
+    of an agent with degree k and m active providers is the fraction of agents with
+    threshold * (1 - sensation) <= (1 - independence) * m / k.
+
+    :param degrees: list of integers, the (in-)degrees of the agents
+    :param thresholds: float or list of floats in [0,1], the thresholds of the agents
+    :param independence: float or list of floats in [0,1], the independence of the agents
+    :param sensation: float in [0,1], the sensation of the news
+    :param initial_fraction: float in [0,1], fraction of random initial active agents
+    :param tolerance: float, convergence tolerance of the fixed point iteration
+    :param max_iter: int, maximal number of iterations
+    :return: float in [0,1], the expected fraction of active agents at the end of the dynamics
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    ratios = np.sort(_activation_ratios(thresholds, independence, sensation, len(degrees)))
+
+    # Degree distribution P(k) and excess degree distribution k P(k) / <k>
+    counts = np.bincount(degrees)
+    unique_degrees = np.flatnonzero(counts)
+    p_k = counts[unique_degrees] / len(degrees)
+    excess_p_k = unique_degrees * p_k / np.sum(unique_degrees * p_k)
+
+    # response[k, m] = probability that an agent with degree k and m active providers becomes active
+    k_max = unique_degrees.max()
+    m = np.arange(k_max + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fractions = np.where(unique_degrees[:, None] > 0, m[None, :] / unique_degrees[:, None], 0.0)
+    response = np.searchsorted(ratios, fractions + EPSILON, side='right') / len(ratios)
+    response[m[None, :] > unique_degrees[:, None]] = 0.0
+
+    log_factorial = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, k_max + 1)))))
+
+    def expected_response(q, trials):
+        # E[response(M, k)] with M ~ Binomial(trials, q) for each degree
+        q = min(max(q, 1e-300), 1 - 1e-16)
+        valid = m[None, :] <= trials[:, None]
+        m_valid = np.where(valid, m[None, :], 0)
+        log_binomial = (log_factorial[trials][:, None] - log_factorial[m_valid]
+                        - log_factorial[trials[:, None] - m_valid])
+        pmf = np.where(valid, np.exp(log_binomial + m_valid * np.log(q) + (trials[:, None] - m_valid) * np.log(1 - q)),
+                       0.0)
+        return np.sum(pmf * response, axis=1)
+
+    # Probability q that a provider reached along an edge is active
+    q = initial_fraction
+    for _ in range(max_iter):
+        q_new = initial_fraction + (1 - initial_fraction) * np.sum(
+            excess_p_k * expected_response(q, np.maximum(unique_degrees - 1, 0)))
+        if abs(q_new - q) < tolerance:
+            q = q_new
+            break
+        q = q_new
+
+    return float(initial_fraction + (1 - initial_fraction) * np.sum(p_k * expected_response(q, unique_degrees)))
+
+
+def message_passing_cascade(world, sensation=None, initial_active_agents=None, initial_fraction=0.0, tolerance=1e-6,
+                            max_iter=1000, arrays=None):
+    """
+    Tree-approximation (message passing) estimate of the final cascade size on the actual graph.
+
+    The message m_ki along the edge k -> i is the probability that k becomes active in the absence of i:
+    m_ki = rho0_k + (1 - rho0_k) * P((1 - independence_k) * sum_j w_jk X_j >= threshold_k * (1 - sensation))
+    where the sum runs over the providers j != i of k and X_j are independent Bernoulli(m_jk) variables. The
+    probability that agent i is active at the end is computed in the same way from all its incoming messages.
+
+    :param world: an instance of the World class with a single news
+    :param sensation: float in [0,1], the sensation of the news (default: current sensation of the news of the world)
+    :param initial_active_agents: list of integers, names of the initial active agents
+    :param initial_fraction: float in [0,1], fraction of random initial active agents (if there are no initial active
+                             agents)
+    :param tolerance: float, convergence tolerance of the messages
+    :param max_iter: int, maximal number of iterations
+    :param arrays: optional, tuple (indptr, indices, weights, thresholds, independence) as returned by
+                   provider_arrays and parameter_arrays. Pass it to avoid rebuilding the arrays for several estimates
+                   on the same world.
+    :return: fraction, rho: the expected fraction of active agents and the activation probabilities of the agents
+    """
+    if sensation is None:
+        sensation = list(world.news.values())[0].sensation
+    if arrays is None:
+        arrays = provider_arrays(world) + parameter_arrays(world)
+    indptr, indices, weights, thresholds, independence = arrays
+
+    number_agents = len(indptr) - 1
+    rho_0 = np.full(number_agents, float(initial_fraction))
+    if initial_active_agents is not None:
+        _, index = agent_index(world)
+        rho_0[:] = 0.0
+        rho_0[[index[name] for name in initial_active_agents]] = 1.0
+
+    in_degrees = np.diff(indptr)
+    rows = np.repeat(np.arange(number_agents), in_degrees)
+    effective_weights = (1 - independence[rows]) * weights
+    targets = thresholds * (1 - sensation) - EPSILON
+
+    # The message along the in-edge e = (k -> i) of agent i is computed from the providers of k without i, that is
+    # without the in-edge reverse[e] = (i -> k) of agent k (-1 if there is no such edge)
+    keys = rows * number_agents + indices
+    order = np.argsort(keys)
+    reverse_keys = indices * number_agents + rows
+    positions = np.minimum(np.searchsorted(keys, reverse_keys, sorter=order), len(keys) - 1)
+    reverse = np.where(keys[order[positions]] == reverse_keys, order[positions], -1) if len(keys) > 0 \
+        else np.zeros(0, dtype=np.int64)
+
+    # Group the agents with small in-degree for the exact evaluation
+    exact_groups = [(d, np.flatnonzero(in_degrees == d)) for d in range(EXACT_DEGREE + 1)]
+    approximated = np.flatnonzero(in_degrees > EXACT_DEGREE)
+    approximated_edges = np.flatnonzero(in_degrees[rows] > EXACT_DEGREE)
+
+    messages = rho_0[indices]
+    for _ in range(max_iter):
+        full, cavity = _activation(messages, exact_groups, approximated, approximated_edges, indptr, rows,
+                                   effective_weights, targets, number_agents)
+        senders = indices
+        messages_new = rho_0[senders] + (1 - rho_0[senders]) * np.where(reverse >= 0, cavity[reverse], full[senders])
+        converged = len(messages) == 0 or np.max(np.abs(messages_new - messages)) < tolerance
+        messages = messages_new
+        if converged:
+            break
+
+    full, _ = _activation(messages, exact_groups, approximated, approximated_edges, indptr, rows, effective_weights,
+                          targets, number_agents)
+    rho = rho_0 + (1 - rho_0) * full
+
+    return float(np.mean(rho)), rho
+
+
+def deviation_from_simulation(num_agents=500, sensations=(0.2, 0.4, 0.6, 0.8), initial_agents=5, num_samples=5,
+                              max_iter=100):
+    """
+    Compares the estimates with full simulations on the worlds of agent_phase_diagram.ipynb (powerlaw cluster graph,
+    random thresholds and independence, random initial active agents). Both estimates only know the fraction of
+    initial active agents. Note that with the actual initial active agents the message passing estimate reproduces
+    the simulation on trees, since all the messages are then either 0 or 1.
+
+    :param num_agents: integer, the number of agents
+    :param sensations: list of floats in [0,1], the sensations of the news
+    :param initial_agents: integer, the number of initial active agents
+    :param num_samples: integer, the number of sampled worlds per sensation
+    :param max_iter: int, maximal number of iterations of the simulations
+    :return: list of dictionaries, one per sensation, with the mean fraction of active agents from the simulations
+             and the estimates and the mean absolute deviation of the estimates from the simulations
+    """
+    from .critical import cascade_fraction, sample_world, set_parameter
+
+    report = []
+    for sensation in sensations:
+        simulated, mean_field, message_passing = [], [], []
+        for _ in range(num_samples):
+            world, initial_agent_names = sample_world(num_agents, initial_agents)
+            set_parameter(world, 'sensation', sensation)
+            simulated.append(cascade_fraction(world, initial_agent_names, max_iter))
+
+            arrays = provider_arrays(world) + parameter_arrays(world)
+            mean_field.append(mean_field_cascade(np.diff(arrays[0]), arrays[3], arrays[4], sensation,
+                                                 initial_agents / num_agents))
+            message_passing.append(message_passing_cascade(world, sensation, initial_fraction=initial_agents / num_agents,
+                                                           arrays=arrays)[0])
+
+        simulated, mean_field, message_passing = np.array(simulated), np.array(mean_field), np.array(message_passing)
+        report.append({
+            'sensation': sensation,
+            'simulation': np.mean(simulated),
+            'mean field': np.mean(mean_field),
+            'message passing': np.mean(message_passing),
+            'deviation mean field': np.mean(np.abs(mean_field - simulated)),
+            'deviation message passing': np.mean(np.abs(message_passing - simulated))
+        })
+
+    return report
+
+
+def _activation_ratios(thresholds, independence, sensation, number_agents):
+    # An agent becomes active once the fraction of active providers is at least threshold * (1 - sensation) /
+    # (1 - independence). Fully independent agents are never activated (unless their threshold is reached at zero).
+    thresholds = np.broadcast_to(np.asarray(thresholds, dtype=float), (number_agents,))
+    independence = np.broadcast_to(np.asarray(independence, dtype=float), (number_agents,))
+    targets = thresholds * (1 - sensation)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(independence < 1, targets / (1 - independence), np.inf)
+    ratios[targets <= 0] = 0.0
+    return ratios
+
+
+def _activation(messages, exact_groups, approximated, approximated_edges, indptr, rows, effective_weights, targets,
+                number_agents):
+    # Returns the activation probability of each agent given all its incoming messages (full) and, for each in-edge,
+    # the activation probability of the agent without that in-edge (cavity)
+    full = np.zeros(number_agents)
+    cavity = np.zeros(len(messages))
+    for degree, agents in exact_groups:
+        if len(agents) > 0:
+            _exact_activation(agents, degree, indptr, messages, effective_weights, targets, full, cavity)
+    _normal_activation(approximated, approximated_edges, rows, messages, effective_weights, targets, number_agents,
+                       full, cavity)
+    return full, cavity
+
+
+def _exact_activation(agents, degree, indptr, messages, effective_weights, targets, full, cavity, chunk_size=16384):
+    # Enumerates the 2^degree configurations of the providers of the agents (in chunks to bound the memory). Bit t of
+    # a configuration tells whether the provider in slot t is active.
+    configurations = np.arange(2 ** degree)
+    for start in range(0, len(agents), chunk_size):
+        chunk = agents[start:start + chunk_size]
+        edges = indptr[chunk][:, None] + np.arange(degree)[None, :]
+
+        probabilities = np.ones((len(chunk), 1))
+        sums = np.zeros((len(chunk), 1))
+        for t in range(degree):
+            p = messages[edges[:, t]][:, None]
+            w = effective_weights[edges[:, t]][:, None]
+            probabilities = np.hstack((probabilities * (1 - p), probabilities * p))
+            sums = np.hstack((sums, sums + w))
+
+        active = sums >= targets[chunk][:, None]
+        full[chunk] = np.sum(probabilities * active, axis=1)
+
+        # Without the provider in slot t: marginalise over bit t and keep the sums of the configurations where it is
+        # not active
+        for t in range(degree):
+            off = configurations[(configurations >> t) & 1 == 0]
+            on = off | (1 << t)
+            cavity[edges[:, t]] = np.sum((probabilities[:, off] + probabilities[:, on]) * active[:, off], axis=1)
+
+
+def _normal_activation(agents, edges, rows, messages, effective_weights, targets, number_agents, full, cavity):
+    # Normal approximation of the weighted sum of the active providers
+    mean = np.bincount(rows, weights=effective_weights * messages, minlength=number_agents)
+    variance = np.bincount(rows, weights=effective_weights ** 2 * messages * (1 - messages), minlength=number_agents)
+    full[agents] = _normal_tail(mean[agents], variance[agents], targets[agents])
+
+    edge_rows = rows[edges]
+    edge_messages = messages[edges]
+    cavity[edges] = _normal_tail(mean[edge_rows] - effective_weights[edges] * edge_messages,
+                                 variance[edge_rows] - effective_weights[edges] ** 2 * edge_messages *
+                                 (1 - edge_messages),
+                                 targets[edge_rows])
+
+
+def _normal_tail(mean, variance, targets):
+    # P(X >= target) for X normal, a step function if the variance vanishes
+    std = np.sqrt(np.maximum(variance, 0.0))
+    probabilities = (mean >= targets).astype(float)
+    spread = std > EPSILON
+    probabilities[spread] = 0.5 * _erfc((targets[spread] - mean[spread]) / (std[spread] * np.sqrt(2)))
+    return probabilities
+
+
+def _erfc(x):
+    # Complementary error function (Abramowitz and Stegun 7.1.26, absolute error < 1.5e-7)
+    z = np.abs(x)
+    t = 1 / (1 + 0.3275911 * z)
+    polynomial = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erfc_z = polynomial * np.exp(-z ** 2)
+    return np.where(x >= 0, erfc_z, 2 - erfc_z)
@@ -0,0 +1,209 @@
+"""
+Reordering of the agents to improve the memory locality of the array representations of large worlds.
+
+The names of the agents are whatever the graph generator assigned, hence the providers and receivers of an agent are
+spread over the whole arrays (see arrays.py). Reordering puts connected agents close to each other. Only the positions
+of the agents change: the names of the agents, the initial agents and the results stay the original ones, and
+arrays.agent_index gives the mapping between names and positions in both directions.
+"""
+import copy
+import time
+from collections import deque
+
+import numpy as np
+
+from .agent import AgentState
+from .arrays import agent_index, provider_arrays
+
+
+ORDERS = ('degree', 'bfs', 'rcm', 'community')
+
+
+def locality_order(graph, order):
+    """
+    :param graph: nx.DiGraph, a directed graph representing the connections between the agents
+    :param order: string, one of ORDERS
+                  * degree: by decreasing degree (the hubs, which appear in most neighbourhoods, are together)
+                  * bfs: breadth first search from the agent with the highest degree (for each component)
+                  * rcm: reverse Cuthill-McKee (breadth first search from low degree agents, neighbours by increasing
+                    degree, reversed), which reduces the bandwidth of the adjacency matrix
+                  * community: communities found by label propagation, largest first, bfs order inside each community
+    :return: list, the names of the agents in the new order
+    """
+    degrees = dict(graph.degree())
+
+    if order == 'degree':
+        return sorted(graph.nodes(), key=lambda node: -degrees[node])
+    elif order == 'bfs':
+        return _breadth_first_order(graph, sorted(graph.nodes(), key=lambda node: -degrees[node]),
+                                    lambda node: -degrees[node])
+    elif order == 'rcm':
+        return _breadth_first_order(graph, sorted(graph.nodes(), key=lambda node: degrees[node]),
+                                    lambda node: degrees[node])[::-1]
+    elif order == 'community':
+        import networkx as nx
+
+        communities = sorted(nx.algorithms.community.label_propagation_communities(graph.to_undirected()), key=len,
+                             reverse=True)
+        names = []
+        for community in communities:
+            subgraph = graph.subgraph(community)
+            names.extend(_breadth_first_order(subgraph, sorted(community, key=lambda node: -degrees[node]),
+                                              lambda node: -degrees[node]))
+        return names
+    else:
+        raise ValueError('Unknown order ' + str(order) + ', expected one of ' + str(ORDERS))
+
+
+def ordered_graph(graph, names):
+    """
+    Copy of a graph whose nodes and edges are inserted in the given order (networkx keeps the insertion order, which
+    then is the order of world.agents and of the providers and receivers of the agents)
+
+    :param graph: nx.DiGraph, a directed graph representing the connections between the agents
+    :param names: list, the names of the nodes in the new order
+    :return: nx.DiGraph, the reordered graph (same names, nodes and edge attributes)
+    """
+    position = dict([(name, i) for i, name in enumerate(names)])
+
+    reordered = graph.__class__()
+    reordered.graph.update(graph.graph)
+    reordered.add_nodes_from((name, graph.nodes[name]) for name in names)
+    reordered.add_edges_from(sorted(graph.edges(data=True), key=lambda edge: (position[edge[0]], position[edge[1]])))
+    return reordered
+
+
+def reorder_world(world, order):
+    """
+    Reorders the agents and the graph of an existing world in place
+
+    :param world: an instance of the World class
+    :param order: string, one of ORDERS
+    """
+    names = locality_order(world.graph, order)
+    position = dict([(name, i) for i, name in enumerate(names)])
+
+    world.graph = ordered_graph(world.graph, names)
+    world.agents = dict([(name, world.agents[name]) for name in names])
+    for agent in world.agents.values():
+        agent.providers.sort(key=lambda name: position[name])
+        agent.receivers.sort(key=lambda name: position[name])
+
+    world.graph_version = world.graph_version + 1
+    world.refresh_accumulators()
+
+
+def edge_span(world):
+    """
+    Mean distance between the positions of the two agents of an edge (small values mean good locality)
+
+    :param world: an instance of the World class
+    :return: float
+    """
+    indptr, indices, _ = provider_arrays(world)
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return float(np.mean(np.abs(rows - indices)))
+
+
+def benchmark(world, orders=ORDERS, initial_agents=None, max_iter=100, active_fraction=0.3, repeats=20):
+    """
+    Measures the time per step of World.update in the original order of the world and in the given orders. For each
+    order a deep copy of the world is reordered (see reorder_world), reset and the initial agents are activated wrt
+    the first news, then the steps of the dynamics are timed until convergence (in the update mode of the world). The
+    dynamics are the same in all orders.
+
+    World.update works on the dictionaries of the agents, which are not contiguous in memory, hence it gains little
+    from reordering. The time of an array based step (the excitement scores of all agents computed from the
+    provider arrays with a random set of active agents, see arrays.py) is measured too, it is the kind of traversal
+    whose memory accesses are made more local by reordering.
+
+    :param world: an instance of the World class, it is not modified
+    :param orders: list of strings, the orders to compare with the original one
+    :param initial_agents: list of integers, the initial active agents (default: 1% of the agents chosen at random)
+    :param max_iter: int, maximal number of timed steps
+    :param active_fraction: float in [0,1], fraction of active agents of the array based step
+    :param repeats: integer, number of timed array based steps
+    :return: dictionary, key = order ('original' for the original order), value = dictionary with the time per step
+             of World.update in seconds, the number of steps, the time per array based step in seconds and the mean
+             edge span
+    """
+    news_name = next(iter(world.news))
+    if initial_agents is None:
+        initial_agents = np.random.choice(list(world.agents), max(1, len(world.agents) // 100),
+                                          replace=False).tolist()
+
+    indptr, indices, weights = provider_arrays(world)
+    active = (np.random.random(len(indptr) - 1) < active_fraction).astype(float)
+    _, index = agent_index(world)
+
+    report = {}
+    for order in ('original',) + tuple(orders):
+        ordered_world = copy.deepcopy(world)
+        if order == 'original':
+            permutation = np.arange(len(active))
+        else:
+            reorder_world(ordered_world, order)
+            permutation = np.array([index[name] for name in ordered_world.agents])
+
+        ordered_world.reset()
+        for name in initial_agents:
+            ordered_world.set_agent_state(name, news_name, AgentState.ACTIVE)
+        steps = 0
+        elapsed = 0.0
+        while steps < max_iter:
+            start = time.perf_counter()
+            changed = ordered_world.update(verbose=True)
+            elapsed += time.perf_counter() - start
+            steps += 1
+            if not changed:
+                break
+
+        order_indptr, order_indices, order_weights = _permuted_arrays(indptr, indices, weights, permutation)
+        rows = np.repeat(np.arange(len(order_indptr) - 1), np.diff(order_indptr))
+        order_active = active[permutation]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            np.bincount(rows, weights=order_weights * order_active[order_indices], minlength=len(order_active))
+
+        report[order] = {
+            'time per step': elapsed / steps,
+            'steps': steps,
+            'array time per step': (time.perf_counter() - start) / repeats,
+            'edge span': float(np.mean(np.abs(rows - order_indices)))
+        }
+
+    return report
+
+
+def _permuted_arrays(indptr, indices, weights, permutation):
+    # Compressed sparse row arrays after moving the agent at position permutation[i] to position i
+    inverse = np.empty_like(permutation)
+    inverse[permutation] = np.arange(len(permutation))
+
+    rows = inverse[np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))]
+    columns = inverse[indices]
+    edges = np.lexsort((columns, rows))
+
+    permuted_indptr = np.zeros(len(indptr), dtype=np.int64)
+    permuted_indptr[1:] = np.cumsum(np.bincount(rows, minlength=len(indptr) - 1))
+    return permuted_indptr, columns[edges], weights[edges]
+
+
+def _breadth_first_order(graph, starts, key):
+    # Breadth first search over the in- and out-neighbours, started from each unvisited agent in starts and visiting
+    # the neighbours sorted by key
+    visited = set()
+    names = []
+    for start in starts:
+        if start in visited:
+            continue
+        visited.add(start)
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            names.append(node)
+            neighbours = set(graph.successors(node)) | set(graph.predecessors(node))
+            for neighbour in sorted(neighbours - visited, key=key):
+                visited.add(neighbour)
+                queue.append(neighbour)
+    return names
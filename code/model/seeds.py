@@ -0,0 +1,218 @@
+"""
+Selection of the initial active agents (seeds) by centrality.
+
+The centrality scores are computed with numpy over the array representation of the world (see arrays.py) and are
+cached per world, so that several values of k, blacklists and news reuse the same computation.
+"""
+import weakref
+
+import numpy as np
+
+from .arrays import agent_index, provider_arrays, receiver_arrays
+
+
+CENTRALITIES = ('out_degree', 'out_strength', 'pagerank', 'k_core', 'betweenness')
+
+# key = world, value = dictionary with the cached arrays and scores of the world
+_cache = weakref.WeakKeyDictionary()
+
+
+def top_k(world, k, centrality='out_degree', blacklist=()):
+    """
+    Finds the k agents with the highest centrality which are not in the blacklist. Ties are broken by the order of
+    the agents in world.agents (as the greedy search in find_degreecentral_nodes).
+
+    :param world: an instance of the World class
+    :param k: integer, the number of agents
+    :param centrality: string, one of CENTRALITIES
+    :param blacklist: list of integers, names of the agents which cannot be selected
+    :return: list of integers, names of the selected agents sorted by decreasing centrality
+    """
+    values = scores(world, centrality).astype(float)
+    names, index = _world_cache(world)['index']
+
+    excluded = np.array([index[name] for name in blacklist], dtype=np.int64)
+    values[excluded] = -np.inf
+    k = min(k, len(values) - len(np.unique(excluded)))
+    if k <= 0:
+        return []
+
+    # k-th largest value, the agents above it are selected and the ties are filled in the order of the agents
+    kth_value = values[np.argpartition(-values, k - 1)[k - 1]]
+    above = np.flatnonzero(values > kth_value)
+    ties = np.flatnonzero(values == kth_value)[:k - len(above)]
+    selected = np.concatenate((above, ties))
+    selected = selected[np.lexsort((selected, -values[selected]))]
+
+    return [names[position] for position in selected]
+
+
+def scores(world, centrality='out_degree'):
+    """
+    Centrality scores of the agents, in the order of world.agents (cached per world)
+
+    * out_degree: the number of receivers
+    * out_strength: the sum of the weights of the receivers
+    * pagerank: PageRank of the walk going from each agent to one of its providers with probability given by the
+      weight of the provider, i.e. the influence of an agent is high if it influences influential agents
+    * k_core: the largest k such that the agent is in a subgraph where each agent has at least k receivers
+    * betweenness: betweenness centrality along the out-edges estimated from a sample of sources
+
+    :param world: an instance of the World class
+    :param centrality: string, one of CENTRALITIES
+    :return: numpy array with the scores of the agents
+    """
+    cache = _world_cache(world)
+    if centrality not in cache['scores']:
+        if centrality == 'out_degree':
+            indptr, _, _ = cache['receivers']
+            cache['scores'][centrality] = np.diff(indptr)
+        elif centrality == 'out_strength':
+            indptr, _, weights = cache['receivers']
+            cache['scores'][centrality] = np.bincount(_rows(indptr), weights=weights, minlength=len(indptr) - 1)
+        elif centrality == 'pagerank':
+            cache['scores'][centrality] = pagerank(*cache['providers'])
+        elif centrality == 'k_core':
+            cache['scores'][centrality] = k_core(*cache['receivers'][:2])
+        elif centrality == 'betweenness':
+            cache['scores'][centrality] = betweenness(*cache['receivers'][:2])
+        else:
+            raise ValueError('Unknown centrality ' + str(centrality) + ', expected one of ' + str(CENTRALITIES))
+
+    return cache['scores'][centrality]
+
+
+def clear_cache(world):
+    """
+    Removes the cached scores of a world (the cache is already invalidated by World.edit_edges)
+
+    :param world: an instance of the World class
+    """
+    _cache.pop(world, None)
+
+
+def pagerank(indptr, indices, weights, damping=0.85, tolerance=1e-10, max_iter=200):
+    """
+    :param indptr, indices, weights: the providers of the agents, see provider_arrays
+    :param damping: float in (0,1), the damping factor
+    :param tolerance: float, convergence tolerance (l1 norm)
+    :param max_iter: int, maximal number of iterations
+    :return: numpy array with the PageRank of the agents
+    """
+    number_agents = len(indptr) - 1
+    rows = _rows(indptr)
+
+    # Normalise the weights of the providers of each agent, agents without providers jump uniformly
+    totals = np.bincount(rows, weights=weights, minlength=number_agents)
+    probabilities = weights / totals[rows]
+    dangling = totals <= 0
+
+    rank = np.full(number_agents, 1.0 / number_agents)
+    for _ in range(max_iter):
+        rank_new = damping * np.bincount(indices, weights=rank[rows] * probabilities, minlength=number_agents)
+        rank_new += (damping * np.sum(rank[dangling]) + 1 - damping) / number_agents
+        converged = np.sum(np.abs(rank_new - rank)) < tolerance
+        rank = rank_new
+        if converged:
+            break
+
+    return rank
+
+
+def k_core(indptr, indices):
+    """
+    Core numbers wrt the out-degree, computed by peeling all the agents with out-degree <= k at once
+
+    :param indptr, indices: the receivers of the agents, see receiver_arrays
+    :return: numpy array with the core numbers of the agents
+    """
+    number_agents = len(indptr) - 1
+    rows = _rows(indptr)
+    degrees = np.diff(indptr).astype(np.int64)
+    core = np.zeros(number_agents, dtype=np.int64)
+    alive = np.ones(number_agents, dtype=bool)
+
+    k = 0
+    while np.any(alive):
+        peeled = alive & (degrees <= k)
+        if not np.any(peeled):
+            k = np.min(degrees[alive])
+            continue
+        core[peeled] = k
+        alive[peeled] = False
+
+        # The providers of the peeled agents lose a receiver
+        lost = peeled[indices] & alive[rows]
+        degrees -= np.bincount(rows[lost], minlength=number_agents)
+
+    return core
+
+
+def betweenness(indptr, indices, samples=64, seed=None):
+    """
+    Betweenness centrality along the out-edges (unweighted shortest paths), estimated with Brandes' algorithm from
+    a random sample of sources and rescaled to all sources
+
+    :param indptr, indices: the receivers of the agents, see receiver_arrays
+    :param samples: integer, the number of sources
+    :param seed: optional, seed of the random number generator (default: the global random state of numpy)
+    :return: numpy array with the estimated betweenness of the agents
+    """
+    number_agents = len(indptr) - 1
+    random_state = np.random if seed is None else np.random.RandomState(seed)
+    sources = random_state.choice(number_agents, min(samples, number_agents), replace=False)
+
+    centrality = np.zeros(number_agents)
+    for source in sources:
+        distance = np.full(number_agents, -1, dtype=np.int64)
+        paths = np.zeros(number_agents)
+        distance[source] = 0
+        paths[source] = 1.0
+
+        # Breadth first search level by level, keeping the edges of the shortest paths of each level
+        levels = []
+        frontier = np.array([source])
+        while len(frontier) > 0:
+            tails, heads = _out_edges(indptr, indices, frontier)
+            new = heads[distance[heads] == -1]
+            distance[new] = distance[source] + len(levels) + 1
+            shortest = distance[heads] == len(levels) + 1
+            tails, heads = tails[shortest], heads[shortest]
+            paths += np.bincount(heads, weights=paths[tails], minlength=number_agents)
+            levels.append((tails, heads))
+            frontier = np.unique(new)
+
+        # Accumulate the dependencies from the farthest level back to the source
+        dependency = np.zeros(number_agents)
+        for tails, heads in reversed(levels):
+            dependency += np.bincount(tails, weights=paths[tails] / paths[heads] * (1 + dependency[heads]),
+                                      minlength=number_agents)
+        dependency[source] = 0.0
+        centrality += dependency
+
+    return centrality * number_agents / len(sources)
+
+
+def _world_cache(world):
+    # The cache is rebuilt if the graph of the world has been modified
+    if world not in _cache or _cache[world]['graph_version'] != world.graph_version:
+        _cache[world] = {
+            'graph_version': world.graph_version,
+            'index': agent_index(world),
+            'providers': provider_arrays(world),
+            'receivers': receiver_arrays(world),
+            'scores': {}
+        }
+    return _cache[world]
+
+
+def _rows(indptr):
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _out_edges(indptr, indices, agents):
+    # All the edges (tail, head) starting at the given agents
+    starts = indptr[agents]
+    counts = indptr[agents + 1] - starts
+    offsets = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(agents, counts), indices[np.repeat(starts, counts) + offsets]
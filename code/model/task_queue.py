@@ -0,0 +1,443 @@
+"""
+Sweeps distributed over several processes or machines through a SQLite task queue.
+
+The coordinator writes the tasks of a sweep (world spec, parameter cell and seed) to a SQLite file on a shared
+directory. Workers on any machine which mounts the directory claim the tasks atomically, run them and write the
+results back. A claimed task is leased for a limited time, so that the tasks of crashed workers are claimed again once
+their lease expired. Note that SQLite locking is not reliable on some network file systems (e.g. old NFS versions).
+
+Usage (from the code folder):
+    python -m model.task_queue submit queue.db sweep.json
+    python -m model.task_queue worker queue.db
+    python -m model.task_queue status queue.db
+    python -m model.task_queue merge queue.db results.csv
+"""
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+
+
+# Default world spec of a task, see run_task
+DEFAULT_SPEC = {
+    'num_agents': 100,
+    'threshold': 'random',
+    'independence': 'random',
+    'news': [{'sensation': 0.5, 'decay_parameter': 0.0, 'initial_agents': 3, 'selection': 'random'}],
+    'max_iter': 100,
+    'update_mode': 'pull',
+    'seed': None
+}
+
+
+class TaskQueue:
+    def __init__(self, path, lease_time=None, max_attempts=None):
+        """
+        The lease time and the maximal number of attempts are stored in the SQLite file when the queue is created, so
+        that all the workers of the queue use the values of the coordinator.
+
+        :param path: string, path of the SQLite file (created if it does not exist)
+        :param lease_time: float, seconds after which a task claimed by a worker can be claimed by another worker
+                           (default: the value stored in the queue, 3600 for a new queue)
+        :param max_attempts: integer, number of times a failing task is run before it is marked as failed (default:
+                             the value stored in the queue, 3 for a new queue)
+        """
+        self.path = path
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS tasks ('
+                               'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'spec TEXT NOT NULL, '
+                               'status TEXT NOT NULL DEFAULT \'pending\', '
+                               'worker TEXT, '
+                               'lease_expires REAL, '
+                               'attempts INTEGER NOT NULL DEFAULT 0, '
+                               'result TEXT, '
+                               'error TEXT)')
+            connection.execute('CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires)')
+            connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)')
+            connection.executemany('INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)',
+                                   [('lease_time', 3600.0 if lease_time is None else lease_time),
+                                    ('max_attempts', 3 if max_attempts is None else max_attempts)])
+            meta = dict(connection.execute('SELECT key, value FROM meta').fetchall())
+
+        self.lease_time = meta['lease_time'] if lease_time is None else lease_time
+        self.max_attempts = int(meta['max_attempts'] if max_attempts is None else max_attempts)
+
+    def submit(self, specs):
+        """
+        :param specs: list of dictionaries, the specs of the tasks (see run_task)
+        :return: list of integers, the ids of the tasks
+        """
+        with closing(self._connect()) as connection, connection:
+            return [connection.execute('INSERT INTO tasks (spec) VALUES (?)', (json.dumps(spec),)).lastrowid
+                    for spec in specs]
+
+    def claim(self, worker):
+        """
+        Claims a pending task or a running task whose lease expired. A task whose lease expired after max_attempts
+        attempts (e.g. a task which kills its worker) is marked as failed instead of being claimed again.
+
+        :param worker: string, the name of the worker
+        :return: (task_id, spec) or None if there is no task to claim
+        """
+        now = time.time()
+        connection = self._connect(isolation_level=None)
+        try:
+            # BEGIN IMMEDIATE takes the write lock, hence two workers cannot claim the same task
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('UPDATE tasks SET status = \'failed\', lease_expires = NULL, error = \'lease expired\' '
+                               'WHERE status = \'running\' AND lease_expires < ? AND attempts >= ?',
+                               (now, self.max_attempts))
+            row = connection.execute('SELECT id, spec FROM tasks '
+                                     'WHERE status = \'pending\' '
+                                     'OR (status = \'running\' AND lease_expires < ? AND attempts < ?) '
+                                     'ORDER BY id LIMIT 1', (now, self.max_attempts)).fetchone()
+            if row is not None:
+                connection.execute('UPDATE tasks SET status = \'running\', worker = ?, lease_expires = ?, '
+                                   'attempts = attempts + 1 WHERE id = ?', (worker, now + self.lease_time, row[0]))
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def renew(self, task_id, worker):
+        """
+        Extends the lease of a running task
+
+        :return: bool, False if the task is not leased to the worker anymore
+        """
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute('UPDATE tasks SET lease_expires = ? '
+                                        'WHERE id = ? AND worker = ? AND status = \'running\'',
+                                        (time.time() + self.lease_time, task_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, worker, result):
+        """
+        Stores the result of a task (unless another worker already completed it)
+
+        :param result: dictionary, the result of the task
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute('UPDATE tasks SET status = \'done\', worker = ?, result = ?, lease_expires = NULL '
+                               'WHERE id = ? AND status != \'done\'', (worker, json.dumps(result), task_id))
+
+    def fail(self, task_id, worker, error):
+        """
+        Releases a task which raised an error, it is marked as failed after max_attempts attempts
+
+        :param error: string, description of the error
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute('UPDATE tasks '
+                               'SET status = CASE WHEN attempts >= ? THEN \'failed\' ELSE \'pending\' END, '
+                               'error = ?, lease_expires = NULL WHERE id = ? AND worker = ? AND status = \'running\'',
+                               (self.max_attempts, error, task_id, worker))
+
+    def progress(self):
+        """
+        :return: dictionary, key = status (pending, running, expired, done, failed), value = number of tasks
+        """
+        counts = dict.fromkeys(['pending', 'running', 'expired', 'done', 'failed'], 0)
+        with closing(self._connect()) as connection, connection:
+            rows = connection.execute('SELECT CASE WHEN status = \'running\' AND lease_expires < ? THEN \'expired\' '
+                                      'ELSE status END, COUNT(*) FROM tasks GROUP BY 1', (time.time(),)).fetchall()
+        counts.update(rows)
+        return counts
+
+    def results(self):
+        """
+        :return: list of pairs (spec, result) of the completed tasks
+        """
+        with closing(self._connect()) as connection, connection:
+            rows = connection.execute('SELECT spec, result FROM tasks WHERE status = \'done\' ORDER BY id').fetchall()
+        return [(json.loads(spec), json.loads(result)) for spec, result in rows]
+
+    def merge(self, path):
+        """
+        Writes the specs and results of the completed tasks to a csv file (one row per task, nested keys are joined
+        with dots, e.g. news.0.sensation)
+
+        :param path: string, path of the csv file
+        :return: integer, the number of rows
+        """
+        return write_results(self.results(), path)
+
+    def _connect(self, **kwargs):
+        return sqlite3.connect(self.path, timeout=60.0, **kwargs)
+
+
+def sweep_specs(base, grid, num_samples=1, seed=0):
+    """
+    Builds the specs of a sweep: one task per cell of the grid and per sample, each with its own seed
+
+    :param base: dictionary, the spec shared by all tasks (missing keys are taken from DEFAULT_SPEC)
+    :param grid: dictionary, key = dotted path of a spec entry (e.g. 'news.0.sensation'), value = list of values
+    :param num_samples: integer, the number of samples per cell
+    :param seed: integer, the seed of the first task
+    :return: list of dictionaries, the specs of the tasks
+    """
+    specs = []
+    keys = list(grid.keys())
+    for values in itertools.product(*[grid[key] for key in keys]):
+        for _ in range(num_samples):
+            spec = copy.deepcopy(DEFAULT_SPEC)
+            spec.update(copy.deepcopy(base))
+            for key, value in zip(keys, values):
+                _set_path(spec, key, value)
+            spec['seed'] = seed
+            seed = seed + 1
+            specs.append(spec)
+    return specs
+
+
+def build_world(spec):
+    """
+    Builds the world of a spec and activates the initial agents
+
+    The spec contains num_agents, threshold and independence (a float for all agents or 'random' for uniform random
+    values), news (list of dictionaries with sensation, decay_parameter, initial_agents and selection, 'random' or one
+    of the centralities of seeds.py), max_iter, update_mode and seed (of numpy and of the graph, so that the same spec
+    always gives the same world).
+
+    :param spec: dictionary, the spec of the task (missing keys are taken from DEFAULT_SPEC)
+    :return: world, initial_agents: an instance of the World class and a dictionary, key = name of news, value = list
+             with the names of the initial active agents
+    """
+    from .agent import AgentState
+    from .news import News
+    from .seeds import top_k
+    from .utils import construct_world
+
+    spec = dict(list(DEFAULT_SPEC.items()) + list(spec.items()))
+    if spec['seed'] is not None:
+        np.random.seed(spec['seed'])
+
+    num_agents = spec['num_agents']
+    names_agents = list(range(num_agents))
+    thresholds = np.random.random(num_agents) if spec['threshold'] == 'random' else [spec['threshold']] * num_agents
+    independence = np.random.random(num_agents) if spec['independence'] == 'random' \
+        else [spec['independence']] * num_agents
+    news = {}
+    for name, news_spec in enumerate(spec['news']):
+        news[name] = News(name, news_spec['sensation'], news_spec.get('decay_parameter', 0.0))
+
+    world = construct_world(names_agents, thresholds, independence, news, seed=spec['seed'])
+    world.update_mode = spec['update_mode']
+
+    # The initial agents of the different news are disjoint
+    initial_agents = {}
+    blacklist = []
+    for name, news_spec in enumerate(spec['news']):
+        if news_spec.get('selection', 'random') == 'random':
+            excluded = set(blacklist)
+            candidates = [agent_name for agent_name in names_agents if agent_name not in excluded]
+            selected = [int(agent_name) for agent_name in np.random.choice(candidates, news_spec['initial_agents'],
+                                                                           replace=False)]
+        else:
+            selected = top_k(world, news_spec['initial_agents'], news_spec['selection'], blacklist=blacklist)
+        for agent_name in selected:
+            world.agents[agent_name].states[name] = AgentState.ACTIVE
+        initial_agents[name] = selected
+        blacklist.extend(selected)
+
+    return world, initial_agents
+
+
+def run_task(spec):
+    """
+    Builds the world of a spec (see build_world) and runs full_dynamics
+
+    :param spec: dictionary, the spec of the task
+    :return: dictionary with the number of active, inactive and ignorant agents at the end of the dynamics
+    """
+    world, _ = build_world(spec)
+
+    number_active, number_inactive, number_ignorant = world.full_dynamics(
+        max_iter=spec.get('max_iter', DEFAULT_SPEC['max_iter']))
+    if not isinstance(number_active, dict):
+        number_active = {0: number_active}
+
+    return {
+        'number_active': dict([(str(name), count) for name, count in number_active.items()]),
+        'number_inactive': number_inactive,
+        'number_ignorant': number_ignorant,
+        'time': world.time
+    }
+
+
+def write_results(results, path):
+    """
+    Writes specs and results to a csv file (one row per task, nested keys are joined with dots, e.g.
+    news.0.sensation)
+
+    :param results: list of pairs (spec, result)
+    :param path: string, path of the csv file
+    :return: integer, the number of rows
+    """
+    rows = [dict(list(_flatten(spec).items()) + list(_flatten(result, 'result').items())) for spec, result in results]
+    columns = sorted(set(itertools.chain.from_iterable(rows)))
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return len(rows)
+
+
+def run_worker(path, worker=None, lease_time=None, poll_interval=5.0, wait=False, max_tasks=None):
+    """
+    Claims and runs tasks until the queue is empty
+
+    :param path: string, path of the SQLite file
+    :param worker: string, the name of the worker (default: host name and process id)
+    :param lease_time: float, optional, seconds after which the task of a crashed worker can be claimed again
+                       (default: the lease time of the queue, the lease of a running task is renewed every third of
+                       the lease time)
+    :param poll_interval: float, seconds to wait before looking again for tasks (if wait is True)
+    :param wait: bool, if True the worker keeps waiting for new tasks (and expired leases) when the queue is empty
+    :param max_tasks: integer, optional, maximal number of tasks to run
+    :return: integer, the number of tasks run by the worker
+    """
+    if worker is None:
+        worker = socket.gethostname() + ':' + str(os.getpid())
+    queue = TaskQueue(path, lease_time=lease_time)
+
+    number_tasks = 0
+    while max_tasks is None or number_tasks < max_tasks:
+        task = queue.claim(worker)
+        if task is None:
+            progress = queue.progress()
+            if not wait and progress['pending'] == 0 and progress['expired'] == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        task_id, spec = task
+
+        # The lease is renewed while the task runs, so that long tasks are not claimed by other workers
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_renew_lease, args=(queue, task_id, worker, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = run_task(spec)
+        except Exception as error:
+            queue.fail(task_id, worker, repr(error))
+        else:
+            queue.complete(task_id, worker, result)
+        finally:
+            stop.set()
+            heartbeat.join()
+        number_tasks += 1
+
+    return number_tasks
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Sweeps through a SQLite task queue')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    submit = commands.add_parser('submit', help='submit the tasks of a sweep config (json with base, grid, '
+                                                'num_samples and seed)')
+    submit.add_argument('queue')
+    submit.add_argument('config')
+    submit.add_argument('--lease-time', type=float, default=None, help='lease time of a new queue (default: 3600)')
+    submit.add_argument('--max-attempts', type=int, default=None, help='attempts per task of a new queue (default: 3)')
+
+    add_worker_arguments(commands.add_parser('worker', help='run tasks until the queue is empty'))
+
+    status = commands.add_parser('status', help='print the number of tasks per status')
+    status.add_argument('queue')
+
+    merge = commands.add_parser('merge', help='write the results to a csv file')
+    merge.add_argument('queue')
+    merge.add_argument('output')
+
+    arguments = parser.parse_args(arguments)
+    if arguments.command == 'submit':
+        with open(arguments.config) as file:
+            config = json.load(file)
+        specs = sweep_specs(config.get('base', {}), config.get('grid', {}), config.get('num_samples', 1),
+                            config.get('seed', 0))
+        TaskQueue(arguments.queue, arguments.lease_time, arguments.max_attempts).submit(specs)
+        print('Submitted', len(specs), 'tasks')
+    elif arguments.command == 'worker':
+        worker_command(arguments)
+    elif arguments.command == 'status':
+        print(json.dumps(TaskQueue(arguments.queue).progress()))
+    elif arguments.command == 'merge':
+        number_rows = TaskQueue(arguments.queue).merge(arguments.output)
+        print('Merged', number_rows, 'results into', arguments.output)
+
+
+def add_worker_arguments(parser):
+    """
+    Adds the arguments of the worker command (also used by python -m model worker)
+
+    :param parser: argparse.ArgumentParser, the parser of the worker command
+    """
+    parser.add_argument('queue')
+    parser.add_argument('--name', default=None)
+    parser.add_argument('--lease-time', type=float, default=None, help='default: the lease time of the queue')
+    parser.add_argument('--wait', action='store_true', help='keep waiting for new tasks')
+    parser.add_argument('--max-tasks', type=int, default=None)
+
+
+def worker_command(arguments):
+    """
+    Runs the worker command
+
+    :param arguments: argparse.Namespace, the arguments parsed by a parser built with add_worker_arguments
+    """
+    number_tasks = run_worker(arguments.queue, arguments.name, arguments.lease_time, wait=arguments.wait,
+                              max_tasks=arguments.max_tasks)
+    print('Worker finished after', number_tasks, 'tasks')
+
+
+def _renew_lease(queue, task_id, worker, stop):
+    # Renews the lease of a task every third of the lease time until stop is set or the task is not leased anymore
+    while not stop.wait(queue.lease_time / 3):
+        if not queue.renew(task_id, worker):
+            break
+
+
+def _set_path(spec, path, value):
+    keys = path.split('.')
+    for key in keys[:-1]:
+        spec = spec[int(key)] if isinstance(spec, list) else spec[key]
+    spec[int(keys[-1]) if isinstance(spec, list) else keys[-1]] = value
+
+
+def _flatten(entry, prefix=''):
+    if isinstance(entry, dict):
+        items = entry.items()
+    elif isinstance(entry, list):
+        items = enumerate(entry)
+    else:
+        return {prefix: entry}
+
+    flat = {}
+    for key, value in items:
+        flat.update(_flatten(value, prefix + '.' + str(key) if prefix else str(key)))
+    return flat
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,3 @@
-import networkx as nx
 import numpy as np
 import copy
 
@@ -67,14 +66,18 @@ def construct_agent_constant_parameters(number, threshold, independence, news, g
     return construct_agents(names, thresholds_dict, independence_dict, news, graph)
 
 
-def create_graph(num_nodes):
+def create_graph(num_nodes, seed=None):
     """
     Creates directed graph with agents assigned to the nodes and trust values assigned to the edges
 
     :param num_nodes: integer, number of nodes in the graph
+    :param seed: integer, optional, seed of the random graph generator (networkx does not use the seed of numpy)
     :return: graph: nx.DiGraph, a directed graph representing the connections between the agents
     """
-    graph = nx.powerlaw_cluster_graph(num_nodes, 3, 0.5)
+    # networkx is imported only when a graph is created, so that it is not loaded by workers which do not need it
+    import networkx as nx
+
+    graph = nx.powerlaw_cluster_graph(num_nodes, 3, 0.5, seed=seed)
     graph = graph.to_directed()
 
     # Set weights on edges
@@ -93,7 +96,7 @@ def create_graph(num_nodes):
     return graph
 
 
-def construct_world(names_agents, thresholds, independence, news):
+def construct_world(names_agents, thresholds, independence, news, order=None, seed=None):
     """
     Constructs an instance of the World class from the parameters
 
@@ -101,10 +104,13 @@ def construct_world(names_agents, thresholds, independence, news):
     :param thresholds: list of floats in [0,1], thresholds for the agents
     :param independence: list of floats in [0,1], independence of the agents
     :param news: dictionary, key = name of news, value = news object (see class News)
+    :param order: string, optional, reorders the agents to improve the memory locality (see reorder.py)
+    :param seed: integer, optional, seed of the random graph (see create_graph)
     :return: world: an instance of the World class, with agents, news and a graph
     """
     # Construct a graph
-    graph = create_graph(len(names_agents))
+    graph = create_graph(len(names_agents), seed)
+    graph, names_agents = reorder_graph(graph, names_agents, order)
 
     # Constrict the agents
     agents = construct_agents(names_agents, thresholds, independence, news, graph)
@@ -114,7 +120,7 @@ def construct_world(names_agents, thresholds, independence, news):
     return world
 
 
-def construct_world_given_graph(names_agents, thresholds, independence, news, graph):
+def construct_world_given_graph(names_agents, thresholds, independence, news, graph, order=None):
     """
     Constructs an instance of the World class from the parameters
 
@@ -123,8 +129,11 @@ def construct_world_given_graph(names_agents, thresholds, independence, news, gr
     :param independence: list of floats in [0,1], independence of the agents
     :param news: dictionary, key = name of news, value = news object (see class News)
     :param graph: nx.DiGraph, a directed graph modelling interactions in our world
+    :param order: string, optional, reorders the agents to improve the memory locality (see reorder.py)
     :return: world: an instance of the World class, with agents, news and a graph
         """
+    graph, names_agents = reorder_graph(graph, names_agents, order)
+
     # Constrict the agents
     agents = construct_agents(names_agents, thresholds, independence, news, graph)
 
@@ -134,7 +143,7 @@ def construct_world_given_graph(names_agents, thresholds, independence, news, gr
     return world
 
 
-def construct_world_constant_parameters(number_agents, threshold, independence, news):
+def construct_world_constant_parameters(number_agents, threshold, independence, news, order=None, seed=None):
     """
     Constructs an instance of the World class from constant parameters (i.e. the same parameters for all agents)
 
@@ -142,19 +151,42 @@ def construct_world_constant_parameters(number_agents, threshold, independence,
     :param threshold: float in [0,1], the common threshold of all the agents
     :param independence: float in [0,1], the common independence value of all agents of all the agents
     :param news: dictionary, key = name of news, value = news object (see class News)
+    :param order: string, optional, reorders the agents to improve the memory locality (see reorder.py)
+    :param seed: integer, optional, seed of the random graph (see create_graph)
     :return: world: an instance of the World class, with agents, news and a graph
     """
     # Construct a graph
-    graph = create_graph(number_agents)
+    graph = create_graph(number_agents, seed)
+    graph, names_agents = reorder_graph(graph, list(range(number_agents)), order)
 
     # Constrict the agents
-    agents = construct_agent_constant_parameters(number_agents, threshold, independence, news, graph)
+    agents = construct_agents(names_agents, dict.fromkeys(names_agents, threshold),
+                              dict.fromkeys(names_agents, independence), news, graph)
 
     # Constrict the world
     world = World(agents, news, graph)
     return world
     
 
+def reorder_graph(graph, names_agents, order):
+    """
+    Reorders the nodes of the graph and the names of the agents by a locality improving order (see reorder.py). The
+    names of the agents are not changed, only the order in which they are stored.
+
+    :param graph: nx.DiGraph, a directed graph representing the connections between the agents
+    :param names_agents: list of integers, names of the agents
+    :param order: string or None, one of reorder.ORDERS (None keeps the original order)
+    :return: graph, names_agents: the reordered graph and names of the agents
+    """
+    if order is None:
+        return graph, names_agents
+
+    from .reorder import locality_order, ordered_graph
+
+    names = locality_order(graph, order)
+    return ordered_graph(graph, names), names
+
+
 def reachable(network, starting_set):
     """
     do DFS over network and counts how many nodes are reachable form the nodes in the starting set
@@ -189,6 +221,8 @@ def get_expected_number_of_influenced_agents(world, start_agents, n_iterations):
     :param n_iterations: number of iterations that are made (more means more accurate approximation)
     :return: double: expected number of agents influenced if news starts at agents in stating set
     """
+    import networkx as nx
+
     expected = 0
     for iter in range(n_iterations): #for each sample
         sample_graph = nx.Graph() 
@@ -6,7 +6,8 @@ import numpy as np
 from matplotlib.patches import Patch
 
 from .agent import AgentState
-from .color_maps import ColorMaps
+from .arrays import state_array
+from .color_maps import ColorMaps, state_colors
 
 
 class Visualization:
@@ -81,7 +82,7 @@ class Visualization:
                          arrowsize=max(-0.04 * world.graph.order() + 10, 1),
                          with_labels=True,
                          node_size=500,
-                         node_color=[self.determine_color_node(agent) for agent in world.agents.values()],
+                         node_color=self.node_colors(world),
                          alpha=0.8,
                          linewidths=0.0,
                          width=0.2)
@@ -112,6 +113,22 @@ class Visualization:
 
         return color_node
 
+    def node_colors(self, world, states=None):
+        """
+        Determines the colors of all the nodes at once (same colors as determine_color_node). Extracting the states
+        from the agents costs much more than the coloring itself, hence if the state array of the frame is already
+        built it should be passed and reused.
+
+        :param world: class World, the world we want to plot
+        :param states: numpy array, optional, the state array of the world (see arrays.state_array)
+        :return: numpy array of shape (number of agents, 4), the rgba values of the nodes in the order of world.agents
+        """
+        if states is None:
+            states = state_array(world)
+        return state_colors(states, self.color_values_nodes['ignorant'],
+                            self.color_values_nodes['inactive'],
+                            [self.color_values_nodes[news_name] for news_name in world.news])
+
     def animate(self, frames, interval=1000, path='animation'):
         """
         Creates an animation of the network dynamics (i.e. graph with nodes changing colors) and then saves it in path
@@ -153,7 +170,7 @@ class Visualization:
                          arrowsize=max(-0.04 * world.graph.order() + 10, 1),
                          with_labels=True,
                          node_size=500,
-                         node_color=[self.determine_color_node(agent) for agent in world.agents.values()],
+                         node_color=self.node_colors(world),
                          alpha=0.8,
                          linewidths=0.0,
                          width=0.2)
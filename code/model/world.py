@@ -1,18 +1,35 @@
 
-from .agent import AgentState
+from .agent import Agent, AgentState
 
 
 class World:
-    def __init__(self, agents, news, graph):
+    def __init__(self, agents, news, graph, update_mode='pull'):
         """
         :param news: dictionary, key = name of news, value = news object (see class News)
         :param agents: dictionary, key = name of the agent, value = agent object (see class Agent)
         :param graph: nx.DiGraph, a directed graph representing the connections between the agents
+        :param update_mode: string, 'pull' or 'push'. In the pull mode every agent recomputes its excitement scores
+                            from its providers at every update. In the push mode the world keeps the excitement scores
+                            of the agents and the agents changing the news wrt which they are active push the change to
+                            their receivers, so that only these receivers are checked (see update). The excitement scores
+                            are summed in a different order in the two modes, hence exact ties between the scores of
+                            two news can be resolved differently because of rounding errors.
         """
         self.agents = agents
         self.news = news
         self.graph = graph
         self.time = 0
+        self.update_mode = update_mode
+
+        # Incremented at every modification of the graph (see edit_edges), allows to invalidate cached arrays
+        self.graph_version = 0
+
+        # Accumulators of the push mode, built at the first update (see refresh_accumulators)
+        self.excitement_scores = None
+        self.active_provider_counts = None
+        self._pushed_news = None
+        self._candidates = None
+        self._sensations = None
 
     def update(self, verbose=False):
         """
@@ -27,16 +44,27 @@ class World:
         """
 
         agents_changing_state = {}
-        for agent in self.agents.values():
-            updated_states = agent.updated_states(self.news, self.agents)
-            # If the updated states differ from the current states add the agent to the agents which are changing state
-            if agent.states != updated_states:
-                agents_changing_state[agent.name] = updated_states
+        if self.update_mode == 'push':
+            agents_changing_state = self._push_mode_changes()
+        else:
+            for agent in self.agents.values():
+                updated_states = agent.updated_states(self.news, self.agents)
+                # If the updated states differ from the current states add the agent to the agents which are changing
+                # state
+                if agent.states != updated_states:
+                    agents_changing_state[agent.name] = updated_states
 
         # Modify the states of the agents who's states should be modified
         for agent_name in agents_changing_state:
             self.agents[agent_name].states = agents_changing_state[agent_name]
 
+        if self.update_mode == 'push':
+            # The agents which changed state are checked again at the next update, together with the receivers of the
+            # agents which changed the news wrt which they are active
+            self._candidates = set(agents_changing_state.keys())
+            for agent_name in agents_changing_state:
+                self._push(agent_name)
+
         # Update the parameters of the news
         for nw in self.news.values():
             nw.update()
@@ -44,9 +72,27 @@ class World:
         # Update time
         self.time = self.time + 1
 
+        if self.update_mode == 'push':
+            self._sensations = dict([(nw.name, nw.sensation) for nw in self.news.values()])
+
         if verbose:
             return len(agents_changing_state.keys())
 
+    def reset(self):
+        """
+        Resets the world to its initial condition: all agents are ignorant wrt all news, the news are reset and the
+        time is set back to zero. The graph and the parameters of the agents are left untouched, so that the same
+        world can be used for several simulations.
+        """
+        for agent in self.agents.values():
+            agent.states = dict([(news_name, AgentState.IGNORANT) for news_name in self.news])
+
+        for nw in self.news.values():
+            nw.reset()
+
+        self.time = 0
+        self.refresh_accumulators()
+
     def full_dynamics(self, max_iter=100):
         """
         Updates the world until convergence.
@@ -69,3 +115,227 @@ class World:
         number_ignorant = len([agent for agent in self.agents.values() if agent.is_ignorant()])
 
         return number_active, number_inactive, number_ignorant
+
+    def edit_edges(self, add=(), remove=()):
+        """
+        Adds and removes edges during a simulation.
+
+        The weight of an edge is the out-degree of its tail normalised over the in-going edges of its head (see
+        create_graph). Hence only the weights of the in-going edges of the heads of the edited edges and of the
+        receivers of their tails are recomputed, for the edges, the providers and the receivers of the agents.
+
+        :param add: list of pairs of integers (tail, head), the edges to add (existing edges are ignored)
+        :param remove: list of pairs of integers (tail, head), the edges to remove (missing edges are ignored)
+        """
+        add = list(add)
+        remove = list(remove)
+
+        # Check all the edges before modifying anything, so that the graph and the agents stay consistent
+        for tail, head in add + remove:
+            for name in (tail, head):
+                if name not in self.agents:
+                    raise ValueError('Unknown agent ' + str(name) + ' in edge ' + str((tail, head)))
+
+        tails = set()
+        heads = set()
+
+        for tail, head in remove:
+            if not self.graph.has_edge(tail, head):
+                continue
+            self.graph.remove_edge(tail, head)
+            self.agents[tail].receivers.remove(head)
+            del self.agents[tail].weights_receivers[head]
+            self.agents[head].providers.remove(tail)
+            del self.agents[head].weights_providers[tail]
+            tails.add(tail)
+            heads.add(head)
+
+        for tail, head in add:
+            if tail == head or self.graph.has_edge(tail, head):
+                continue
+            self.graph.add_edge(tail, head, weight=0.0)
+            self.agents[tail].receivers.append(head)
+            self.agents[tail].weights_receivers[head] = 0.0
+            self.agents[head].providers.append(tail)
+            self.agents[head].weights_providers[tail] = 0.0
+            tails.add(tail)
+            heads.add(head)
+
+        # The out-degree of the tails changed, hence the in-going weights of all their receivers change
+        affected = set(heads)
+        for tail in tails:
+            affected.update(self.agents[tail].receivers)
+        self.normalize_weights(affected)
+
+        # The excitement scores of the push mode change only for the agents whose in-going weights changed
+        if self.excitement_scores is not None:
+            for name in affected:
+                self._accumulate(name)
+            self._candidates.update(affected)
+
+        self.graph_version = self.graph_version + 1
+
+    def normalize_weights(self, agent_names):
+        """
+        Recomputes the weights of the in-going edges of the agents from the out-degrees of their providers
+
+        :param agent_names: list of integers, the names of the agents
+        """
+        for name in agent_names:
+            agent = self.agents[name]
+            sum_ingoing = sum(len(self.agents[provider].receivers) for provider in agent.providers)
+            for provider in agent.providers:
+                weight = len(self.agents[provider].receivers) / sum_ingoing
+                agent.weights_providers[provider] = weight
+                self.agents[provider].weights_receivers[name] = weight
+                self.graph.edges[provider, name]['weight'] = weight
+
+    def add_agent(self, name, threshold, independence, providers=(), receivers=()):
+        """
+        Adds an agent (ignorant wrt all news) during a simulation
+
+        :param name: integer, the name of the agent
+        :param threshold: float in [0,1], threshold for becoming active
+        :param independence: float in [0,1], the level of influence other agents have on the agent
+        :param providers: list of integers, names of the information providers of the agent
+        :param receivers: list of integers, names of the information receivers of the agent
+        """
+        if name in self.agents:
+            raise ValueError('Agent ' + str(name) + ' already exists')
+        for neighbour in list(providers) + list(receivers):
+            if neighbour not in self.agents and neighbour != name:
+                raise ValueError('Unknown agent ' + str(neighbour))
+
+        states = dict([(news_name, AgentState.IGNORANT) for news_name in self.news])
+        self.agents[name] = Agent(name, states, threshold, independence, [], [], {}, {})
+        self.graph.add_node(name)
+
+        if self.excitement_scores is not None:
+            self._pushed_news[name] = None
+            self._accumulate(name)
+
+        self.edit_edges(add=[(provider, name) for provider in providers] + [(name, receiver) for receiver in receivers])
+
+    def remove_agents(self, names):
+        """
+        Removes agents together with all their edges during a simulation
+
+        :param names: list of integers, the names of the agents
+        """
+        edges = set()
+        for name in names:
+            edges.update((provider, name) for provider in self.agents[name].providers)
+            edges.update((name, receiver) for receiver in self.agents[name].receivers)
+        self.edit_edges(remove=edges)
+
+        for name in names:
+            del self.agents[name]
+            self.graph.remove_node(name)
+
+            if self.excitement_scores is not None:
+                del self.excitement_scores[name]
+                del self.active_provider_counts[name]
+                del self._pushed_news[name]
+                self._candidates.discard(name)
+
+    def set_agent_state(self, name, news_name, state):
+        """
+        Sets the state of an agent wrt a news (e.g. to activate the initial agents). In the push mode the change is
+        pushed to the receivers of the agent. If the states of the agents are modified directly in the push mode,
+        refresh_accumulators has to be called.
+
+        :param name: integer, the name of the agent
+        :param news_name: integer, the name of the news
+        :param state: AgentState, the new state of the agent wrt the news
+        """
+        self.agents[name].states[news_name] = state
+
+        if self.excitement_scores is not None:
+            self._candidates.add(name)
+            self._push(name)
+
+    def refresh_accumulators(self):
+        """
+        Discards the accumulators of the push mode, they are rebuilt from the states of all agents at the next update.
+        This is needed after modifying the states or the parameters (independence) of the agents directly.
+        """
+        self.excitement_scores = None
+        self.active_provider_counts = None
+        self._pushed_news = None
+        self._candidates = None
+        self._sensations = None
+
+    def _build_accumulators(self):
+        # Excitement scores and number of active providers of each agent for each news, from the current states
+        self._pushed_news = {}
+        for agent in self.agents.values():
+            self._pushed_news[agent.name] = agent.name_news_active() if agent.is_active() else None
+
+        self.excitement_scores = {}
+        self.active_provider_counts = {}
+        for name in self.agents:
+            self._accumulate(name)
+
+        self._candidates = set(self.agents.keys())
+        self._sensations = dict([(nw.name, nw.sensation) for nw in self.news.values()])
+
+    def _accumulate(self, name):
+        # Recomputes the accumulators of an agent from its providers
+        agent = self.agents[name]
+        excitement_scores = dict([(news_name, 0.0) for news_name in self.news])
+        active_provider_counts = dict([(news_name, 0) for news_name in self.news])
+        for provider in agent.providers:
+            name_news_active = self._pushed_news[provider]
+            if name_news_active is not None:
+                excitement_scores[name_news_active] += (1 - agent.independence) * agent.weights_providers[provider]
+                active_provider_counts[name_news_active] += 1
+
+        self.excitement_scores[name] = excitement_scores
+        self.active_provider_counts[name] = active_provider_counts
+
+    def _push(self, name):
+        # If the news wrt which the agent is active changed, moves its weight between the excitement scores of its
+        # receivers
+        agent = self.agents[name]
+        old_news = self._pushed_news[name]
+        new_news = agent.name_news_active() if agent.is_active() else None
+        if old_news == new_news:
+            return
+        self._pushed_news[name] = new_news
+
+        for receiver in agent.receivers:
+            independence = self.agents[receiver].independence
+            weight = agent.weights_receivers[receiver]
+            if old_news is not None:
+                self.active_provider_counts[receiver][old_news] -= 1
+                if self.active_provider_counts[receiver][old_news] == 0:
+                    # Avoid the accumulation of rounding errors
+                    self.excitement_scores[receiver][old_news] = 0.0
+                else:
+                    self.excitement_scores[receiver][old_news] -= (1 - independence) * weight
+            if new_news is not None:
+                self.active_provider_counts[receiver][new_news] += 1
+                self.excitement_scores[receiver][new_news] += (1 - independence) * weight
+            self._candidates.add(receiver)
+
+    def _push_mode_changes(self):
+        # Checks the thresholds of the candidate agents only. An agent whose excitement scores and states did not
+        # change keeps its states, unless the threshold of a news decreased (i.e. its sensation increased).
+        if self.excitement_scores is None:
+            self._build_accumulators()
+
+        candidates = self._candidates
+        if any(nw.sensation > self._sensations[nw.name] for nw in self.news.values()):
+            candidates = self.agents.keys()
+
+        agents_changing_state = {}
+        for name in candidates:
+            agent = self.agents[name]
+            news_active_providers = set(news_name for news_name, count in self.active_provider_counts[name].items()
+                                        if count > 0)
+            updated_states = agent.states_given_excitement(self.news, self.excitement_scores[name],
+                                                           news_active_providers)
+            if agent.states != updated_states:
+                agents_changing_state[name] = updated_states
+
+        return agents_changing_state